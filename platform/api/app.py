@@ -4,59 +4,364 @@ Centralized Security Scanning Platform - REST API
 Handles uploads, scan management, and results retrieval
 """
 
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, send_file
 from flask_cors import CORS
+from flask_compress import Compress
 import os
-import json
 import uuid
+import re
+import time
+import sqlite3
+import mimetypes
+import functools
+import base64
+import threading
+import contextlib
+import fcntl
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import subprocess
 import tempfile
 import shutil
 from datetime import datetime
 from pathlib import Path
+from urllib.parse import quote
 import zipfile
-import git
 from werkzeug.utils import secure_filename
+import orjson
+import zstandard
+from streaming_form_data import StreamingFormDataParser
+from streaming_form_data.parser import ParseFailedException
+from streaming_form_data.targets import FileTarget, ValueTarget
 
 app = Flask(__name__)
 CORS(app)
 
+# Offload result downloads to the front-end web server when deployed behind one
+app.config['USE_X_SENDFILE'] = os.getenv("X_SENDFILE", "").lower() in ("1", "true", "yes")
+X_ACCEL_REDIRECT_PREFIX = os.getenv("X_ACCEL_REDIRECT_PREFIX", "")
+RESULTS_MAX_AGE = int(os.getenv("RESULTS_MAX_AGE", "0"))  # results can be regenerated; revalidate via ETag by default
+
+# Compress JSON API responses for clients that accept it. Not registered app-wide:
+# result downloads are served as files (sendfile/X-Sendfile) or from precompressed copies.
+mimetypes.add_type('application/sarif+json', '.sarif')
+app.config['COMPRESS_REGISTER'] = False
+app.config['COMPRESS_ALGORITHM'] = ['zstd', 'br', 'gzip']
+app.config['COMPRESS_MIMETYPES'] = ['application/json']
+app.config['COMPRESS_MIN_SIZE'] = 4096
+app.config['COMPRESS_ZSTD_LEVEL'] = 3
+compress = Compress(app)
+PRECOMPRESSED_DIR = ".compressed"  # per-scan subdirectory holding .zst copies of result files
+
 # Configuration
 UPLOAD_DIR = os.getenv("UPLOAD_DIR", "/tmp/scan-uploads")
 RESULTS_DIR = os.getenv("RESULTS_DIR", "/tmp/scanner-results")
 STORAGE_DIR = os.getenv("STORAGE_DIR", "/tmp/scan-storage")
+SCAN_INDEX_DB = os.getenv("SCAN_INDEX_DB", os.path.join(STORAGE_DIR, "scan-index.db"))
+SCAN_LIST_DEFAULT_LIMIT = 50
+SCAN_LIST_MAX_LIMIT = 500
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN", "")
-ALLOWED_EXTENSIONS = {'zip', 'json', 'txt', 'py', 'js', 'java', 'cpp', 'c', 'go', 'cs', 'ts', 'tsx', 'jsx'}
+COPY_BUFSIZE = 1 << 20  # 1 MiB buffers for upload and extraction I/O
+ALLOWED_EXTENSIONS = frozenset({'zip', 'json', 'txt', 'py', 'js', 'java', 'cpp', 'c', 'go', 'cs', 'ts', 'tsx', 'jsx'})
+# New scan IDs are 32 hex chars; dashed UUIDs are still accepted for scans created before the switch
+_VALID_SCAN_ID = re.compile(r'\A(?:[0-9a-f]{32}|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})\Z')
+
+# Scan execution: the dispatcher runs in its own process, so threads only wait on it.
+# SCAN_WORKERS is a global cap shared through slot locks by every worker process using
+# the same STORAGE_DIR; each process can fill all slots, and extra jobs wait queued.
+SCAN_WORKERS = int(os.getenv("SCAN_WORKERS", str(os.cpu_count() or 1)))
+SCAN_SLOTS_DIR = os.path.join(STORAGE_DIR, "scan-slots")
+SCAN_SLOT_POLL_INTERVAL = 1.0  # seconds between checks while every slot is busy
+SCAN_TIMEOUT = int(os.getenv("SCAN_TIMEOUT", "3600"))  # 1 hour timeout
+SCAN_EXECUTOR = ThreadPoolExecutor(max_workers=SCAN_WORKERS, thread_name_prefix="scan")
+ACTIVE_SCAN_STATES = ("queued", "running")
+INTERNAL_STATUS_FIELDS = frozenset({"pid", "host", "updated_at"})  # bookkeeping in older status files
+
+# Repository inspection
+DEP_PATTERNS = [
+    "package.json", "package-lock.json", "yarn.lock", "pnpm-lock.yaml",
+    "requirements.txt", "Pipfile.lock", "poetry.lock",
+    "pom.xml", "build.gradle", "gradle.lockfile",
+    "go.mod", "go.sum",
+    "Cargo.toml", "Cargo.lock",
+    "Gemfile", "Gemfile.lock",
+    "composer.lock"
+]
+DEP_NAMES = frozenset(DEP_PATTERNS)
+LANG_EXTENSIONS = {
+    "java": [".java"],
+    "cpp": [".cpp", ".c", ".h", ".hpp"],
+    "go": [".go"],
+    "javascript": [".js", ".jsx", ".ts", ".tsx"],
+    "python": [".py"],
+    "csharp": [".cs"]
+}
+LANGUAGES = list(LANG_EXTENSIONS)
+EXT_TO_LANG = {ext: lang for lang, exts in LANG_EXTENSIONS.items() for ext in exts}
+# Heavy directories holding VCS metadata, vendored dependencies, caches or build output
+PRUNE_DIRS = frozenset({
+    ".git", "node_modules", "vendor", "venv", ".venv", "__pycache__",
+    "dist", "build", "target", ".tox", ".mypy_cache"
+})
+INSPECT_WORKERS = int(os.getenv("INSPECT_WORKERS", "8"))
 
 # Ensure directories exist
-for directory in [UPLOAD_DIR, RESULTS_DIR, STORAGE_DIR]:
+for directory in [UPLOAD_DIR, RESULTS_DIR, STORAGE_DIR, SCAN_SLOTS_DIR]:
     os.makedirs(directory, exist_ok=True)
 
+def json_response(data, status=200):
+    """Serialize data with orjson into a JSON response"""
+    return app.response_class(orjson.dumps(data), status=status, mimetype='application/json')
+
+def _resolve_script(candidates):
+    """Return the first existing script path from candidates, made executable, or None"""
+    for path in candidates:
+        abs_path = os.path.abspath(path)
+        if os.path.exists(abs_path):
+            # Ensure script is executable (ignore errors on read-only filesystems)
+            try:
+                os.chmod(abs_path, 0o755)
+            except OSError:
+                # Read-only volume or insufficient permissions: assume script is already executable
+                pass
+            return abs_path
+    return None
+
+# Dispatcher scripts are resolved once at startup rather than on every scan
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DISPATCHER_CANDIDATES = [
+    os.path.join(SCRIPT_DIR, '..', 'dispatcher', 'dispatcher.sh'),
+    os.path.join(SCRIPT_DIR, '..', '..', 'platform', 'dispatcher', 'dispatcher.sh'),
+    os.path.join('/app', '..', 'dispatcher', 'dispatcher.sh'),
+    os.path.join(os.path.dirname(SCRIPT_DIR), 'dispatcher', 'dispatcher.sh'),
+    'platform/dispatcher/dispatcher.sh',  # Relative from workspace root
+]
+SUMMARY_CANDIDATES = [
+    os.path.join(SCRIPT_DIR, '..', 'dispatcher', 'generate-summary.sh'),
+    os.path.join(SCRIPT_DIR, '..', '..', 'platform', 'dispatcher', 'generate-summary.sh'),
+    os.path.join(os.path.dirname(SCRIPT_DIR), 'dispatcher', 'generate-summary.sh'),
+    'platform/dispatcher/generate-summary.sh',
+]
+DISPATCHER_SCRIPT = _resolve_script(DISPATCHER_CANDIDATES)
+SUMMARY_SCRIPT = _resolve_script(SUMMARY_CANDIDATES)
+
+@functools.lru_cache(maxsize=1024)
+def _load_summary(path, mtime_ns):
+    """Parse a summary.json; keyed on mtime so rewritten summaries are re-read"""
+    with open(path, 'rb') as f:
+        return orjson.loads(f.read())
+
+def load_summary(path):
+    """Return the parsed summary at path, raising FileNotFoundError if absent"""
+    return _load_summary(path, os.stat(path).st_mtime_ns)
+
+def _scan_index():
+    """Open a connection to the scan index; use as a context manager to commit"""
+    conn = sqlite3.connect(SCAN_INDEX_DB, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+def _init_scan_index():
+    with _scan_index() as conn:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS scans ("
+            "scan_id TEXT PRIMARY KEY, created_at INTEGER, status TEXT, summary BLOB, "
+            "has_summary INTEGER, result_files BLOB, result_count INTEGER)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS scans_created_at ON scans (created_at)")
+        return conn.execute("SELECT COUNT(*) FROM scans").fetchone()[0]
+
+def _scan_index_row(scan_id, status=None, created_at=None):
+    """Build a scan index row from the scan's summary and result files in RESULTS_DIR"""
+    scan_results_dir = os.path.join(RESULTS_DIR, scan_id)
+    
+    # Read summary if exists
+    summary = {}
+    has_summary = True
+    try:
+        summary = load_summary(os.path.join(scan_results_dir, 'summary.json'))
+    except FileNotFoundError:
+        has_summary = False
+    except Exception as e:
+        summary = {"error": f"Failed to parse summary: {str(e)}"}
+    
+    # Get result files
+    result_files = {}
+    try:
+        with os.scandir(scan_results_dir) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(('.json', '.sarif')):
+                    result_files[entry.name] = {
+                        "size": entry.stat().st_size,
+                        "url": f"/api/v1/scan/{scan_id}/results/{entry.name}"
+                    }
+    except FileNotFoundError:
+        pass
+    
+    if status is None:
+        status = summary.get("metadata", {}).get("status")
+    if created_at is None:
+        created_at = int(time.time())
+    
+    return (scan_id, created_at, status, orjson.dumps(summary), int(has_summary),
+            orjson.dumps(result_files), len(result_files))
+
+# Upsert that keeps a scan's original created_at, so list ordering and pagination stay stable
+_UPSERT_SCAN_ROW = (
+    "INSERT INTO scans "
+    "(scan_id, created_at, status, summary, has_summary, result_files, result_count) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT(scan_id) DO UPDATE SET status = excluded.status, summary = excluded.summary, "
+    "has_summary = excluded.has_summary, result_files = excluded.result_files, "
+    "result_count = excluded.result_count"
+)
+
+def index_scan(scan_id, status=None, created_at=None):
+    """Record a scan's summary and result files from RESULTS_DIR in the scan index"""
+    row = _scan_index_row(scan_id, status, created_at)
+    with _scan_index() as conn:
+        conn.execute(_UPSERT_SCAN_ROW, row)
+
+def reindex_scan_results():
+    """Rebuild the scan index from RESULTS_DIR, returning how many scans were indexed"""
+    rows = []
+    with os.scandir(RESULTS_DIR) as scan_entries:
+        for scan_entry in scan_entries:
+            if scan_entry.is_dir():
+                # Prefer the execution status recorded next to the scan config, if any
+                record = _read_scan_status(os.path.join(UPLOAD_DIR, scan_entry.name)) or {}
+                rows.append(_scan_index_row(scan_entry.name, record.get("status"),
+                                            int(scan_entry.stat().st_mtime)))
+    
+    # Drop rows for deleted scans and upsert the rest in one transaction; existing rows keep
+    # their created_at, the directory mtime only dates scans the index has never seen
+    present = {row[0] for row in rows}
+    with _scan_index() as conn:
+        stale = [(scan_id,) for (scan_id,) in conn.execute("SELECT scan_id FROM scans")
+                 if scan_id not in present]
+        conn.executemany("DELETE FROM scans WHERE scan_id = ?", stale)
+        conn.executemany(_UPSERT_SCAN_ROW, rows)
+    return len(rows)
+
 def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    _, dot, ext = filename.rpartition('.')
+    return bool(dot) and ext.lower() in ALLOWED_EXTENSIONS
+
+GIT_CLONE_TIMEOUT = int(os.getenv("GIT_CLONE_TIMEOUT", "600"))
+
+# Remote transports only: rules out option injection ("-..."), ext::/file:// and local paths
+_REMOTE_REPO_URL = re.compile(r'\A(?:(?:https?|ssh|git)://[^-\s/][^\s]*|\w[\w.-]*@\w[\w.-]*:[^\s]+)\Z', re.IGNORECASE)
+
+def is_safe_repository_url(repo_url):
+    """Accept only remote repository URLs that git cannot interpret as options or command transports"""
+    return not repo_url.startswith("-") and "::" not in repo_url and bool(_REMOTE_REPO_URL.match(repo_url))
 
 def clone_repository(repo_url, branch="main", target_dir=None):
-    """Clone a Git repository"""
+    """Shallow, blobless clone of a single branch via the git CLI"""
     if target_dir is None:
         target_dir = tempfile.mkdtemp(prefix="repo_", dir=UPLOAD_DIR)
     
+    if not is_safe_repository_url(repo_url):
+        raise Exception("Failed to clone repository: unsupported repository URL")
+    if branch.startswith("-"):
+        raise Exception("Failed to clone repository: invalid branch name")
+    
+    git_env = {**os.environ, "GIT_TERMINAL_PROMPT": "0"}
+    if GITHUB_TOKEN and repo_url.startswith("https://github.com/"):
+        # Authenticate private GitHub repositories through an env-scoped config entry so the
+        # token never appears in argv or in the clone's .git/config
+        credentials = base64.b64encode(f"x-access-token:{GITHUB_TOKEN}".encode()).decode()
+        git_env.update({
+            "GIT_CONFIG_COUNT": "1",
+            "GIT_CONFIG_KEY_0": "http.https://github.com/.extraheader",
+            "GIT_CONFIG_VALUE_0": f"Authorization: Basic {credentials}"
+        })
+    
+    # Blobs of the checked-out tree are fetched on demand; history and other blobs are never transferred
+    cmd = [
+        "git", "clone", "--depth=1", "--single-branch", f"--branch={branch}",
+        "--filter=blob:none", "--no-tags", "--", repo_url, target_dir
+    ]
+    
     try:
-        repo = git.Repo.clone_from(repo_url, target_dir, branch=branch, depth=1)
-        return target_dir
-    except Exception as e:
-        raise Exception(f"Failed to clone repository: {str(e)}")
+        result = subprocess.run(
+            cmd,
+            capture_output=True,
+            text=True,
+            timeout=GIT_CLONE_TIMEOUT,
+            env=git_env
+        )
+    except subprocess.TimeoutExpired:
+        raise Exception(f"Failed to clone repository: timed out after {GIT_CLONE_TIMEOUT}s")
+    
+    if result.returncode != 0:
+        stderr = result.stderr.strip()
+        if GITHUB_TOKEN:
+            stderr = stderr.replace(GITHUB_TOKEN, "***")
+        raise Exception(f"Failed to clone repository: {stderr}")
+    
+    return target_dir
 
 def extract_zip(zip_path, extract_to):
-    """Extract ZIP file"""
+    """Stream-extract ZIP file entries with large buffered writes, then remove the archive"""
+    root = os.path.realpath(extract_to)
     try:
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall(extract_to)
-        return extract_to
+        with open(zip_path, 'rb', buffering=COPY_BUFSIZE) as raw, zipfile.ZipFile(raw, 'r') as zip_ref:
+            for info in zip_ref.infolist():
+                name = info.filename
+                if os.path.isabs(name) or '..' in Path(name).parts:
+                    raise Exception(f"Unsafe path in archive: {name}")
+                target = os.path.realpath(os.path.join(root, name))
+                if os.path.commonpath([root, target]) != root:
+                    raise Exception(f"Unsafe path in archive: {name}")
+                
+                if info.is_dir():
+                    os.makedirs(target, exist_ok=True)
+                    continue
+                
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with zip_ref.open(info, 'r') as src, open(target, 'wb', buffering=COPY_BUFSIZE) as dst:
+                    shutil.copyfileobj(src, dst, length=COPY_BUFSIZE)
     except Exception as e:
         raise Exception(f"Failed to extract ZIP: {str(e)}")
+    finally:
+        # Free disk space as soon as the tree is written out, and never keep a rejected archive
+        if os.path.exists(zip_path):
+            os.unlink(zip_path)
+    
+    return extract_to
+
+def _classify_files(repo_path, root, files, order, state):
+    """Record languages and dependency files from one directory listing into shared state"""
+    found_langs, found_deps = state["langs"], state["deps"]
+    with state["lock"]:
+        langs_pending = len(found_langs) < len(LANGUAGES)
+        for name in files:
+            if name in DEP_NAMES:
+                # Keep the match from the earliest top-level entry so results don't depend on thread timing
+                previous = found_deps.get(name)
+                if previous is None or order < previous[0]:
+                    found_deps[name] = (order, os.path.relpath(os.path.join(root, name), repo_path))
+            if langs_pending:
+                lang = EXT_TO_LANG.get(os.path.splitext(name)[1])
+                if lang and lang not in found_langs:
+                    found_langs.add(lang)
+                    langs_pending = len(found_langs) < len(LANGUAGES)
+        
+        if len(found_langs) == len(LANGUAGES) and len(found_deps) == len(DEP_NAMES):
+            state["all_found"].set()
+
+def _classify_subtree(repo_path, top_dir, order, state):
+    """Walk one top-level directory of the repository"""
+    for root, dirs, files in os.walk(top_dir):
+        if state["all_found"].is_set():
+            return
+        # Skip VCS metadata, vendored packages and build output
+        dirs[:] = [d for d in dirs if d not in PRUNE_DIRS]
+        _classify_files(repo_path, root, files, order, state)
 
 def inspect_repository(repo_path):
-    """Inspect repository to auto-detect scanners"""
+    """Inspect repository to auto-detect scanners, walking top-level directories in parallel"""
     detected = {
         "languages": [],
         "has_dockerfile": False,
@@ -64,52 +369,79 @@ def inspect_repository(repo_path):
         "dependency_files": []
     }
     
-    repo_path = Path(repo_path)
+    state = {
+        "langs": set(),
+        "deps": {},
+        "lock": threading.Lock(),
+        "all_found": threading.Event()
+    }
+    
+    with os.scandir(repo_path) as it:
+        entries = sorted(it, key=lambda entry: entry.name)
+    top_files = [entry.name for entry in entries if entry.is_file()]
+    top_dirs = [entry.path for entry in entries
+                if entry.is_dir(follow_symlinks=False) and entry.name not in PRUNE_DIRS]
     
-    # Check for Dockerfile
-    if (repo_path / "Dockerfile").exists() or (repo_path / "docker-compose.yml").exists():
+    if "Dockerfile" in top_files or "docker-compose.yml" in top_files:
         detected["has_dockerfile"] = True
     
-    # Check for dependency files
-    dep_patterns = [
-        "package.json", "package-lock.json", "yarn.lock", "pnpm-lock.yaml",
-        "requirements.txt", "Pipfile.lock", "poetry.lock",
-        "pom.xml", "build.gradle", "gradle.lockfile",
-        "go.mod", "go.sum",
-        "Cargo.toml", "Cargo.lock",
-        "Gemfile", "Gemfile.lock",
-        "composer.lock"
-    ]
+    # Root files take precedence over anything found in subdirectories
+    _classify_files(repo_path, repo_path, top_files, -1, state)
     
-    for pattern in dep_patterns:
-        for file in repo_path.rglob(pattern):
-            detected["dependency_files"].append(str(file.relative_to(repo_path)))
-            detected["has_dependencies"] = True
-            break
-    
-    # Detect languages
-    lang_extensions = {
-        "java": [".java"],
-        "cpp": [".cpp", ".c", ".h", ".hpp"],
-        "go": [".go"],
-        "javascript": [".js", ".jsx", ".ts", ".tsx"],
-        "python": [".py"],
-        "csharp": [".cs"]
-    }
+    # Directory reads block on I/O, so threads overlap the latency of separate subtrees
+    if top_dirs and not state["all_found"].is_set():
+        with ThreadPoolExecutor(max_workers=min(INSPECT_WORKERS, len(top_dirs))) as executor:
+            futures = [executor.submit(_classify_subtree, repo_path, top_dir, order, state)
+                       for order, top_dir in enumerate(top_dirs)]
+            for future in as_completed(futures):
+                future.result()
+                if state["all_found"].is_set():
+                    for pending in futures:
+                        pending.cancel()
+                    break
     
-    for lang, exts in lang_extensions.items():
-        for ext in exts:
-            if list(repo_path.rglob(f"*{ext}")):
-                detected["languages"].append(lang)
-                break
+    # Report in the declared order so results are stable across filesystems
+    found_deps = state["deps"]
+    detected["dependency_files"] = [found_deps[name][1] for name in DEP_PATTERNS if name in found_deps]
+    detected["has_dependencies"] = bool(found_deps)
+    detected["languages"] = [lang for lang in LANGUAGES if lang in state["langs"]]
     
     return detected
 
+def _build_scanner_config(osv_enabled, trivy_enabled):
+    return {
+        "semgrep": {"enabled": True, "config_path": "security/semgrep-rules"},
+        "codeql": {"enabled": True, "languages": ["auto"], "build_mode": "auto"},
+        "gitleaks": {"enabled": True, "config_path": "security/gitleaks-rules/gitleaks.toml"},
+        "osv_scanner": {"enabled": osv_enabled},
+        "trivy": {"enabled": trivy_enabled, "scan_type": "fs"},
+        "syft": {"enabled": False, "format": "spdx-json"},
+        "noir": {"enabled": False}
+    }
+
+# Static parts of generated configs, built once and keyed by (osv_scanner, trivy) enablement.
+# They are shared between configs and only ever serialized, never mutated.
+_SCANNER_CONFIGS = {
+    (osv_enabled, trivy_enabled): _build_scanner_config(osv_enabled, trivy_enabled)
+    for osv_enabled in (True, False)
+    for trivy_enabled in (True, False)
+}
+_OUTPUT_CONFIG = {
+    "formats": ["json", "sarif"],
+    "storage": "local",
+    "retention_days": 30
+}
+
 def generate_scan_config(upload_type, target_path, inspection=None, custom_config=None):
     """Generate scan configuration"""
     if custom_config:
         return custom_config
     
+    if inspection:
+        scanners = _SCANNER_CONFIGS[(bool(inspection["has_dependencies"]), bool(inspection["has_dockerfile"]))]
+    else:
+        scanners = _SCANNER_CONFIGS[(True, True)]
+    
     config = {
         "target": {
             "type": upload_type,
@@ -121,41 +453,71 @@ def generate_scan_config(upload_type, target_path, inspection=None, custom_confi
             "single_file": target_path if upload_type == "file" else None
         },
         "auto_detect": True,
-        "scanners": {
-            "semgrep": {"enabled": True, "config_path": "security/semgrep-rules"},
-            "codeql": {"enabled": True, "languages": ["auto"], "build_mode": "auto"},
-            "gitleaks": {"enabled": True, "config_path": "security/gitleaks-rules/gitleaks.toml"},
-            "osv_scanner": {"enabled": inspection["has_dependencies"] if inspection else True},
-            "trivy": {"enabled": inspection["has_dockerfile"] if inspection else True, "scan_type": "fs"},
-            "syft": {"enabled": False, "format": "spdx-json"},
-            "noir": {"enabled": False}
-        },
-        "output": {
-            "formats": ["json", "sarif"],
-            "storage": "local",
-            "retention_days": 30
-        }
+        "scanners": scanners,
+        "output": _OUTPUT_CONFIG
     }
     
     return config
 
+def finalize_upload(scan_id, upload_type, target_dir, target_path, config_text=None):
+    """Inspect uploaded content, write its scan configuration and build the upload response"""
+    # Inspect repository if applicable
+    inspection = None
+    if upload_type in ['repository', 'zip']:
+        inspection = inspect_repository(target_path)
+    
+    # Get custom config if provided
+    custom_config = None
+    if config_text is not None:
+        try:
+            custom_config = orjson.loads(config_text)
+        except orjson.JSONDecodeError:
+            return json_response({"error": "Invalid JSON config"}), 400
+    
+    # Generate scan configuration
+    config = generate_scan_config(upload_type, target_path, inspection, custom_config)
+    config_path = os.path.join(target_dir, "scan-config.json")
+    with open(config_path, 'wb') as f:
+        f.write(orjson.dumps(config, option=orjson.OPT_INDENT_2))
+    
+    return json_response({
+        "scan_id": scan_id,
+        "status": "uploaded",
+        "target_path": target_path,
+        "config": config,
+        "inspection": inspection
+    }), 201
+
+_HEALTH_CACHE = (0, b'')  # (epoch second, serialized health body)
+
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
-    return jsonify({"status": "healthy", "timestamp": datetime.utcnow().isoformat()})
+    global _HEALTH_CACHE
+    now = int(time.time())
+    cached_at, body = _HEALTH_CACHE
+    if now != cached_at:
+        # Serialize at most once per second; load balancers poll this constantly
+        timestamp = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(now))
+        body = orjson.dumps({"status": "healthy", "timestamp": timestamp})
+        _HEALTH_CACHE = (now, body)
+    return app.response_class(body, status=200, mimetype='application/json')
 
 @app.route('/api/v1/scan/upload', methods=['POST'])
+@compress.compressed()
 def upload_scan():
     """Upload file, ZIP, or repository URL for scanning"""
     try:
-        scan_id = str(uuid.uuid4())
+        scan_id = uuid.uuid4().hex
         upload_type = request.form.get('type', 'file')  # file, zip, repository
         
         if upload_type == 'repository':
             repo_url = request.form.get('repository_url')
             branch = request.form.get('branch', 'main')
             if not repo_url:
-                return jsonify({"error": "repository_url is required"}), 400
+                return json_response({"error": "repository_url is required"}), 400
+            if not is_safe_repository_url(repo_url) or branch.startswith('-'):
+                return json_response({"error": "Unsupported repository URL or branch"}), 400
             
             # Clone repository
             target_dir = os.path.join(UPLOAD_DIR, scan_id)
@@ -164,15 +526,15 @@ def upload_scan():
             
         elif upload_type == 'zip':
             if 'file' not in request.files:
-                return jsonify({"error": "No file provided"}), 400
+                return json_response({"error": "No file provided"}), 400
             
             file = request.files['file']
             if file.filename == '':
-                return jsonify({"error": "No file selected"}), 400
+                return json_response({"error": "No file selected"}), 400
             
             # Save and extract ZIP
             zip_path = os.path.join(UPLOAD_DIR, f"{scan_id}.zip")
-            file.save(zip_path)
+            file.save(zip_path, buffer_size=COPY_BUFSIZE)
             target_dir = os.path.join(UPLOAD_DIR, scan_id)
             os.makedirs(target_dir, exist_ok=True)
             extract_zip(zip_path, target_dir)
@@ -180,296 +542,502 @@ def upload_scan():
             
         else:  # single file
             if 'file' not in request.files:
-                return jsonify({"error": "No file provided"}), 400
+                return json_response({"error": "No file provided"}), 400
             
             file = request.files['file']
             if not allowed_file(file.filename):
-                return jsonify({"error": "File type not allowed"}), 400
+                return json_response({"error": "File type not allowed"}), 400
             
             # Save file
             target_dir = os.path.join(UPLOAD_DIR, scan_id)
             os.makedirs(target_dir, exist_ok=True)
             filename = secure_filename(file.filename)
             target_path = os.path.join(target_dir, filename)
-            file.save(target_path)
+            file.save(target_path, buffer_size=COPY_BUFSIZE)
         
-        # Inspect repository if applicable
-        inspection = None
-        if upload_type in ['repository', 'zip']:
-            inspection = inspect_repository(target_path)
+        return finalize_upload(scan_id, upload_type, target_dir, target_path, request.form.get('config'))
         
-        # Get custom config if provided
-        custom_config = None
-        if 'config' in request.form:
-            try:
-                custom_config = json.loads(request.form['config'])
-            except json.JSONDecodeError:
-                return jsonify({"error": "Invalid JSON config"}), 400
+    except Exception as e:
+        return json_response({"error": str(e)}), 500
+
+class FormFieldTarget(ValueTarget):
+    """ValueTarget that remembers whether its part appeared in the body at all"""
+    
+    def __init__(self):
+        super().__init__()
+        self.present = False
+    
+    def on_start(self):
+        self.present = True
+
+@app.route('/api/v1/scan/upload/stream', methods=['POST'])
+@compress.compressed()
+def upload_scan_stream():
+    """Upload a file or ZIP for scanning, streaming the multipart body straight to disk"""
+    staging_path = None
+    try:
+        if request.mimetype != 'multipart/form-data':
+            return json_response({"error": "multipart/form-data body required"}), 400
         
-        # Generate scan configuration
-        config = generate_scan_config(upload_type, target_path, inspection, custom_config)
-        config_path = os.path.join(target_dir, "scan-config.json")
-        with open(config_path, 'w') as f:
-            json.dump(config, f, indent=2)
+        scan_id = uuid.uuid4().hex
+        staging_path = os.path.join(UPLOAD_DIR, f"{scan_id}.upload")
         
-        return jsonify({
-            "scan_id": scan_id,
-            "status": "uploaded",
-            "target_path": target_path,
-            "config": config,
-            "inspection": inspection
-        }), 201
+        # Parse the raw request stream instead of going through request.files
+        parser = StreamingFormDataParser(headers=request.headers)
+        file_target = FileTarget(staging_path)
+        fields = {name: FormFieldTarget() for name in ('type', 'config')}
+        parser.register('file', file_target)
+        for name, target in fields.items():
+            parser.register(name, target)
+        
+        try:
+            while True:
+                chunk = request.stream.read(COPY_BUFSIZE)
+                if not chunk:
+                    break
+                parser.data_received(chunk)
+            
+            # Mirror request.form.get(): a part that was sent, even empty, is used as-is
+            upload_type = fields['type'].value.decode() if fields['type'].present else 'file'  # file, zip
+            config_text = fields['config'].value.decode() if fields['config'].present else None
+        except (ParseFailedException, UnicodeDecodeError):
+            return json_response({"error": "Malformed multipart body"}), 400
+        filename = file_target.multipart_filename or ''
+        
+        if upload_type not in ('file', 'zip'):
+            return json_response({"error": "Only file and zip uploads can be streamed"}), 400
+        if not os.path.exists(staging_path):
+            return json_response({"error": "No file provided"}), 400
+        
+        target_dir = os.path.join(UPLOAD_DIR, scan_id)
+        
+        if upload_type == 'zip':
+            if filename == '':
+                return json_response({"error": "No file selected"}), 400
+            
+            # Extract ZIP
+            os.makedirs(target_dir, exist_ok=True)
+            extract_zip(staging_path, target_dir)
+            target_path = target_dir
+            
+        else:  # single file
+            if not allowed_file(filename):
+                return json_response({"error": "File type not allowed"}), 400
+            
+            os.makedirs(target_dir, exist_ok=True)
+            target_path = os.path.join(target_dir, secure_filename(filename))
+            os.replace(staging_path, target_path)
+        
+        return finalize_upload(scan_id, upload_type, target_dir, target_path, config_text)
         
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return json_response({"error": str(e)}), 500
+    
+    finally:
+        # Consumed by extract_zip or os.replace on success; drop it on every other path
+        if staging_path and os.path.exists(staging_path):
+            os.unlink(staging_path)
+
+def _write_scan_status(scan_dir, record):
+    """Atomically record scan status next to its config so any worker can report it"""
+    status_path = os.path.join(scan_dir, "scan-status.json")
+    tmp_path = f"{status_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(orjson.dumps(record))
+    os.replace(tmp_path, status_path)
+    return record
+
+def _read_scan_status(scan_dir):
+    """Return the recorded scan status, or None if the scan has not been executed"""
+    try:
+        with open(os.path.join(scan_dir, "scan-status.json"), 'rb') as f:
+            return orjson.loads(f.read())
+    except FileNotFoundError:
+        return None
+
+def _acquire_run_lock(scan_dir):
+    """Take the per-scan run lock without blocking; returns the open lock file, or None if held.
+    
+    The job keeps it for its whole life, so the kernel drops it the moment the owning
+    process exits for any reason, whatever its pid or host.
+    """
+    lock_file = open(os.path.join(scan_dir, ".scan-run-lock"), 'a')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return None
+    return lock_file
+
+def _scan_status_is_stale(scan_dir, record):
+    """True if a queued/running record has no live job holding its run lock"""
+    if record.get("status") not in ACTIVE_SCAN_STATES:
+        return False
+    lock_file = _acquire_run_lock(scan_dir)
+    if lock_file is None:
+        return False
+    lock_file.close()
+    return True
+
+@contextlib.contextmanager
+def _scan_lock(scan_dir):
+    """Serialize status transitions for one scan across worker processes"""
+    with open(os.path.join(scan_dir, ".scan-lock"), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+@contextlib.contextmanager
+def _scan_slot():
+    """Hold one of the SCAN_WORKERS slots shared by all worker processes, waiting for a free one"""
+    while True:
+        for slot in range(SCAN_WORKERS):
+            lock_file = open(os.path.join(SCAN_SLOTS_DIR, f"slot-{slot}.lock"), 'a')
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                continue
+            try:
+                yield
+            finally:
+                lock_file.close()
+            return
+        time.sleep(SCAN_SLOT_POLL_INTERVAL)
+
+def _recover_stale_status(scan_id, scan_dir):
+    """Mark a scan orphaned by a worker restart as failed; call while holding _scan_lock"""
+    return _write_scan_status(scan_dir, {
+        "scan_id": scan_id,
+        "status": "failed",
+        "error": "Scan was interrupted before completing (worker restarted); execute it again"
+    })
+
+def _precompress_results(scan_results_dir):
+    """Write zstd copies of result files large enough to be worth compressing"""
+    compressed_dir = os.path.join(scan_results_dir, PRECOMPRESSED_DIR)
+    compressor = zstandard.ZstdCompressor(level=app.config['COMPRESS_ZSTD_LEVEL'])
+    with os.scandir(scan_results_dir) as it:
+        for entry in it:
+            if not entry.is_file() or not entry.name.endswith(('.json', '.sarif')):
+                continue
+            if entry.stat().st_size < app.config['COMPRESS_MIN_SIZE']:
+                continue
+            os.makedirs(compressed_dir, exist_ok=True)
+            zst_path = os.path.join(compressed_dir, f"{entry.name}.zst")
+            tmp_path = f"{zst_path}.tmp"
+            with open(entry.path, 'rb') as src, open(tmp_path, 'wb') as dst:
+                compressor.copy_stream(src, dst, read_size=COPY_BUFSIZE, write_size=COPY_BUFSIZE)
+            os.replace(tmp_path, zst_path)
+
+def _run_scan(scan_id, config_path, scan_dir, scan_results_dir):
+    """Run the dispatcher and summary scripts for a scan and record the outcome"""
+    _write_scan_status(scan_dir, {"scan_id": scan_id, "status": "running"})
+    index_scan(scan_id, "running")
+    
+    # Set up environment for the scan subprocesses without touching os.environ
+    scan_env = {**os.environ, 'RESULTS_DIR': scan_results_dir, 'SCAN_ID': scan_id}
+    
+    try:
+        result = subprocess.run(
+            ['bash', DISPATCHER_SCRIPT, config_path],
+            cwd=scan_dir,
+            capture_output=True,
+            text=True,
+            timeout=SCAN_TIMEOUT,
+            env=scan_env
+        )
+    except subprocess.TimeoutExpired:
+        record = {"scan_id": scan_id, "status": "failed", "error": "Scan timeout"}
+        index_scan(scan_id, "failed")
+        _write_scan_status(scan_dir, record)
+        return record
+    
+    # Check if results were generated (success even if exit code is non-zero)
+    results_exist = os.path.exists(scan_results_dir) and \
+                   len([f for f in os.listdir(scan_results_dir) 
+                       if f.endswith(('.json', '.sarif'))]) > 0
+    
+    status = "completed" if (result.returncode == 0 or results_exist) else "failed"
+    
+    # Generate summary
+    summary_path = os.path.join(scan_results_dir, 'summary.json')
+    if SUMMARY_SCRIPT is not None:
+        subprocess.run(
+            ['bash', SUMMARY_SCRIPT, scan_results_dir, summary_path],
+            capture_output=True,
+            env=scan_env
+        )
+    else:
+        # Generate basic summary if script not found
+        summary = {
+            "metadata": {
+                "timestamp": datetime.utcnow().isoformat(),
+                "scan_id": scan_id,
+                "status": status
+            }
+        }
+        # Count result files
+        if os.path.exists(scan_results_dir):
+            result_files = [f for f in os.listdir(scan_results_dir) 
+                          if f.endswith(('.json', '.sarif'))]
+            for result_file in result_files:
+                scanner_name = result_file.split('-')[0] if '-' in result_file else "unknown"
+                file_path = os.path.join(scan_results_dir, result_file)
+                file_size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+                summary[scanner_name] = {
+                    "file": result_file,
+                    "findings": 0,  # Would need to parse to get actual count
+                    "size_bytes": file_size
+                }
+        
+        with open(summary_path, 'wb') as f:
+            f.write(orjson.dumps(summary, option=orjson.OPT_INDENT_2))
+    
+    # Read summary
+    try:
+        summary = load_summary(summary_path)
+    except FileNotFoundError:
+        summary = {}
+    
+    record = {
+        "scan_id": scan_id,
+        "status": status,
+        "exit_code": result.returncode,
+        "results_generated": results_exist,
+        "summary": summary,
+        "stdout": result.stdout[-5000:] if result.stdout else "",  # Limit stdout size
+        "stderr": result.stderr[-5000:] if result.stderr else ""   # Limit stderr size
+    }
+    _precompress_results(scan_results_dir)
+    index_scan(scan_id, status)
+    _write_scan_status(scan_dir, record)
+    return record
+
+def _run_scan_safely(scan_id, config_path, scan_dir, scan_results_dir, run_lock):
+    """Executor entry point: never let a scan failure go unrecorded"""
+    try:
+        # Stays "queued" until a slot frees up anywhere in the deployment
+        with _scan_slot():
+            return _run_scan(scan_id, config_path, scan_dir, scan_results_dir)
+    except Exception as e:
+        record = {"scan_id": scan_id, "status": "failed", "error": str(e)}
+        _write_scan_status(scan_dir, record)
+        try:
+            index_scan(scan_id, "failed")
+        except Exception:
+            # The index itself may be what failed; the status file still records the error
+            pass
+        return record
+    finally:
+        # Released only after the final status is written
+        run_lock.close()
 
 @app.route('/api/v1/scan/<scan_id>/execute', methods=['POST'])
 def execute_scan(scan_id):
-    """Execute scan for uploaded content"""
+    """Queue scan execution for uploaded content"""
     try:
+        if not _VALID_SCAN_ID.match(scan_id):
+            return json_response({"error": "Invalid scan ID"}), 400
+        
         scan_dir = os.path.join(UPLOAD_DIR, scan_id)
         config_path = os.path.join(scan_dir, "scan-config.json")
         
         if not os.path.exists(config_path):
-            return jsonify({"error": "Scan not found or not configured"}), 404
-        
-        # Read config
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-        
-        # Set up environment
-        os.environ['RESULTS_DIR'] = os.path.join(RESULTS_DIR, scan_id)
-        os.environ['SCAN_ID'] = scan_id
-        os.makedirs(os.environ['RESULTS_DIR'], exist_ok=True)
-        
-        # Execute dispatcher - resolve path correctly
-        # Try multiple possible paths for the dispatcher script
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        possible_paths = [
-            os.path.join(script_dir, '..', 'dispatcher', 'dispatcher.sh'),
-            os.path.join(script_dir, '..', '..', 'platform', 'dispatcher', 'dispatcher.sh'),
-            os.path.join('/app', '..', 'dispatcher', 'dispatcher.sh'),
-            os.path.join(os.path.dirname(script_dir), 'dispatcher', 'dispatcher.sh'),
-            'platform/dispatcher/dispatcher.sh',  # Relative from workspace root
-        ]
-        
-        dispatcher_script = None
-        for path in possible_paths:
-            abs_path = os.path.abspath(path)
-            if os.path.exists(abs_path):
-                dispatcher_script = abs_path
-                break
-        
-        if not dispatcher_script or not os.path.exists(dispatcher_script):
-            return jsonify({
-                "error": f"Dispatcher script not found. Tried: {possible_paths}",
+            return json_response({"error": "Scan not found or not configured"}), 404
+        
+        if DISPATCHER_SCRIPT is None:
+            return json_response({
+                "error": f"Dispatcher script not found. Tried: {DISPATCHER_CANDIDATES}",
                 "current_dir": os.getcwd(),
-                "script_dir": script_dir,
-                "file_dir": os.path.dirname(__file__)
+                "script_dir": SCRIPT_DIR
             }), 500
         
-        # Ensure script is executable (ignore errors on read-only filesystems)
-        try:
-            os.chmod(dispatcher_script, 0o755)
-        except PermissionError:
-            # Read-only volume or insufficient permissions: assume script is already executable
-            pass
-        except OSError as e:
-            # If filesystem is read-only (Errno 30) or other OS errors, continue without failing
-            if getattr(e, "errno", None) not in (30,):
-                # Log or include warning in response context if needed in future
-                pass
-        
-        result = subprocess.run(
-            ['bash', dispatcher_script, config_path],
-            cwd=scan_dir,
-            capture_output=True,
-            text=True,
-            timeout=3600,  # 1 hour timeout
-            env={**os.environ, 'RESULTS_DIR': os.environ['RESULTS_DIR'], 'SCAN_ID': scan_id}
-        )
-        
-        # Generate summary - resolve path correctly
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        possible_summary_paths = [
-            os.path.join(script_dir, '..', 'dispatcher', 'generate-summary.sh'),
-            os.path.join(script_dir, '..', '..', 'platform', 'dispatcher', 'generate-summary.sh'),
-            os.path.join(os.path.dirname(script_dir), 'dispatcher', 'generate-summary.sh'),
-            'platform/dispatcher/generate-summary.sh',
-        ]
-        
-        summary_script = None
-        for path in possible_summary_paths:
-            abs_path = os.path.abspath(path)
-            if os.path.exists(abs_path):
-                summary_script = abs_path
-                break
-        
-        summary_path = os.path.join(os.environ['RESULTS_DIR'], 'summary.json')
-        if summary_script and os.path.exists(summary_script):
-            os.chmod(summary_script, 0o755)
-            subprocess.run(
-                ['bash', summary_script, os.environ['RESULTS_DIR'], summary_path],
-                capture_output=True,
-                env={**os.environ, 'SCAN_ID': scan_id}
-            )
-        else:
-            # Generate basic summary if script not found
-            summary = {
-                "metadata": {
-                    "timestamp": datetime.utcnow().isoformat(),
-                    "scan_id": scan_id,
-                    "status": status
-                }
-            }
-            # Count result files
-            if os.path.exists(os.environ['RESULTS_DIR']):
-                result_files = [f for f in os.listdir(os.environ['RESULTS_DIR']) 
-                              if f.endswith(('.json', '.sarif'))]
-                for result_file in result_files:
-                    scanner_name = result_file.split('-')[0] if '-' in result_file else "unknown"
-                    file_path = os.path.join(os.environ['RESULTS_DIR'], result_file)
-                    file_size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
-                    summary[scanner_name] = {
-                        "file": result_file,
-                        "findings": 0,  # Would need to parse to get actual count
-                        "size_bytes": file_size
-                    }
+        with _scan_lock(scan_dir):
+            # The run lock is held by whichever worker owns a queued or running job
+            run_lock = _acquire_run_lock(scan_dir)
+            if run_lock is None:
+                return json_response({"error": "Scan already queued or running"}), 409
             
-            with open(summary_path, 'w') as f:
-                json.dump(summary, f, indent=2)
+            try:
+                scan_results_dir = os.path.join(RESULTS_DIR, scan_id)
+                os.makedirs(scan_results_dir, exist_ok=True)
+                _write_scan_status(scan_dir, {"scan_id": scan_id, "status": "queued"})
+                index_scan(scan_id, "queued")
+                SCAN_EXECUTOR.submit(_run_scan_safely, scan_id, config_path, scan_dir, scan_results_dir, run_lock)
+            except BaseException:
+                run_lock.close()
+                raise
         
-        # Read summary
-        summary = {}
-        if os.path.exists(summary_path):
-            with open(summary_path, 'r') as f:
-                summary = json.load(f)
+        return json_response({
+            "scan_id": scan_id,
+            "status": "queued",
+            "status_url": f"/api/v1/scan/{scan_id}/status"
+        }), 202
         
-        # Check if results were generated (success even if exit code is non-zero)
-        results_exist = os.path.exists(os.environ['RESULTS_DIR']) and \
-                       len([f for f in os.listdir(os.environ['RESULTS_DIR']) 
-                           if f.endswith(('.json', '.sarif'))]) > 0
+    except Exception as e:
+        return json_response({"error": str(e)}), 500
+
+@app.route('/api/v1/scan/<scan_id>/status', methods=['GET'])
+@compress.compressed()
+def get_scan_status(scan_id):
+    """Get execution status of a scan"""
+    try:
+        if not _VALID_SCAN_ID.match(scan_id):
+            return json_response({"error": "Invalid scan ID"}), 400
         
-        status = "completed" if (result.returncode == 0 or results_exist) else "failed"
+        scan_dir = os.path.join(UPLOAD_DIR, scan_id)
+        record = _read_scan_status(scan_dir)
+        if record is None:
+            return json_response({"error": "Scan has not been executed"}), 404
         
-        return jsonify({
-            "scan_id": scan_id,
-            "status": status,
-            "exit_code": result.returncode,
-            "results_generated": results_exist,
-            "summary": summary,
-            "stdout": result.stdout[-5000:] if result.stdout else "",  # Limit stdout size
-            "stderr": result.stderr[-5000:] if result.stderr else ""   # Limit stderr size
-        }), 200
+        if _scan_status_is_stale(scan_dir, record):
+            with _scan_lock(scan_dir):
+                record = _read_scan_status(scan_dir)
+                if _scan_status_is_stale(scan_dir, record):
+                    record = _recover_stale_status(scan_id, scan_dir)
+                    index_scan(scan_id, "failed")
+        
+        record = {k: v for k, v in record.items() if k not in INTERNAL_STATUS_FIELDS}
+        return json_response(record), 200
         
-    except subprocess.TimeoutExpired:
-        return jsonify({"error": "Scan timeout"}), 504
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return json_response({"error": str(e)}), 500
 
 @app.route('/api/v1/scan/<scan_id>/results', methods=['GET'])
+@compress.compressed()
 def get_results(scan_id):
     """Get scan results"""
     try:
+        if not _VALID_SCAN_ID.match(scan_id):
+            return json_response({"error": "Invalid scan ID"}), 400
+        
         results_dir = os.path.join(RESULTS_DIR, scan_id)
         
         if not os.path.exists(results_dir):
-            return jsonify({"error": "Results not found"}), 404
+            return json_response({"error": "Results not found"}), 404
         
         # List all result files
         results = {}
-        for file in os.listdir(results_dir):
-            file_path = os.path.join(results_dir, file)
-            if os.path.isfile(file_path):
-                file_size = os.path.getsize(file_path)
-                results[file] = {
-                    "size": file_size,
-                    "url": f"/api/v1/scan/{scan_id}/results/{file}"
-                }
+        with os.scandir(results_dir) as it:
+            for entry in it:
+                if entry.is_file():
+                    results[entry.name] = {
+                        "size": entry.stat().st_size,
+                        "url": f"/api/v1/scan/{scan_id}/results/{entry.name}"
+                    }
         
-        return jsonify({
+        return json_response({
             "scan_id": scan_id,
             "results": results
         }), 200
         
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return json_response({"error": str(e)}), 500
 
 @app.route('/api/v1/scan/<scan_id>/results/<filename>', methods=['GET'])
 def download_result(scan_id, filename):
     """Download specific result file"""
     try:
+        if not _VALID_SCAN_ID.match(scan_id):
+            return json_response({"error": "Invalid scan ID"}), 400
+        
         file_path = os.path.join(RESULTS_DIR, scan_id, filename)
         
-        if not os.path.exists(file_path):
-            return jsonify({"error": "File not found"}), 404
+        if not os.path.isfile(file_path):
+            return json_response({"error": "File not found"}), 404
         
-        return send_file(file_path, as_attachment=True)
+        if X_ACCEL_REDIRECT_PREFIX:
+            # Let nginx serve the file from its internal location
+            response = app.response_class(status=200)
+            response.headers['X-Accel-Redirect'] = f"{X_ACCEL_REDIRECT_PREFIX.rstrip('/')}/{scan_id}/{quote(filename)}"
+            # Same quoting send_file applies, with an RFC 5987 fallback for non-ASCII names
+            try:
+                filename.encode('ascii')
+            except UnicodeEncodeError:
+                simple = unicodedata.normalize('NFKD', filename).encode('ascii', 'ignore').decode('ascii')
+                disposition = {'filename': simple, 'filename*': f"UTF-8''{quote(filename, safe='!#$&+^`|~')}"}
+            else:
+                disposition = {'filename': filename}
+            response.headers.set('Content-Disposition', 'attachment', **disposition)
+            return response
+        
+        # Serve the zstd copy written after the scan, skipping runtime compression
+        zst_path = os.path.join(RESULTS_DIR, scan_id, PRECOMPRESSED_DIR, f"{filename}.zst")
+        if request.accept_encodings['zstd'] > 0 and os.path.isfile(zst_path) \
+                and os.path.getmtime(zst_path) >= os.path.getmtime(file_path):
+            response = send_file(
+                zst_path,
+                mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+                as_attachment=True,
+                download_name=filename,
+                conditional=True,
+                etag=True,
+                max_age=RESULTS_MAX_AGE
+            )
+            response.headers['Content-Encoding'] = 'zstd'
+            response.vary.add('Accept-Encoding')
+            return response
+        
+        # Hand the WSGI server a real file so it can use sendfile(2); supports 304 on repeat polls
+        return send_file(file_path, as_attachment=True, conditional=True, etag=True, max_age=RESULTS_MAX_AGE)
         
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return json_response({"error": str(e)}), 500
 
 @app.route('/api/v1/scan/<scan_id>/summary', methods=['GET'])
+@compress.compressed()
 def get_summary(scan_id):
     """Get scan summary"""
     try:
-        summary_path = os.path.join(RESULTS_DIR, scan_id, 'summary.json')
+        if not _VALID_SCAN_ID.match(scan_id):
+            return json_response({"error": "Invalid scan ID"}), 400
         
-        if not os.path.exists(summary_path):
-            return jsonify({"error": "Summary not found"}), 404
+        summary_path = os.path.join(RESULTS_DIR, scan_id, 'summary.json')
         
-        with open(summary_path, 'r') as f:
-            summary = json.load(f)
+        try:
+            summary = load_summary(summary_path)
+        except FileNotFoundError:
+            return json_response({"error": "Summary not found"}), 404
         
-        return jsonify(summary), 200
+        return json_response(summary), 200
         
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return json_response({"error": str(e)}), 500
 
 @app.route('/api/v1/scans', methods=['GET'])
+@compress.compressed()
 def list_scans():
-    """List all scans with detailed information"""
+    """List scans with detailed information, most recent first"""
     try:
-        scans = []
+        try:
+            limit = min(int(request.args.get('limit', SCAN_LIST_DEFAULT_LIMIT)), SCAN_LIST_MAX_LIMIT)
+            offset = int(request.args.get('offset', 0))
+        except ValueError:
+            return json_response({"error": "limit and offset must be integers"}), 400
+        if limit < 0 or offset < 0:
+            return json_response({"error": "limit and offset must be non-negative"}), 400
         
-        # Check if RESULTS_DIR exists
-        if not os.path.exists(RESULTS_DIR):
-            return jsonify({"scans": []}), 200
+        with _scan_index() as conn:
+            rows = conn.execute(
+                "SELECT scan_id, status, summary, has_summary, result_files, result_count FROM scans "
+                "ORDER BY created_at DESC, scan_id DESC LIMIT ? OFFSET ?",
+                (limit, offset)
+            ).fetchall()
+            total = conn.execute("SELECT COUNT(*) FROM scans").fetchone()[0]
         
-        for scan_id in os.listdir(RESULTS_DIR):
-            scan_dir = os.path.join(RESULTS_DIR, scan_id)
-            if not os.path.isdir(scan_dir):
-                continue
-                
-            # Read summary if exists
-            summary_path = os.path.join(scan_dir, 'summary.json')
-            summary = {}
-            if os.path.exists(summary_path):
-                try:
-                    with open(summary_path, 'r') as f:
-                        summary = json.load(f)
-                except Exception as e:
-                    summary = {"error": f"Failed to parse summary: {str(e)}"}
-            
-            # Get result files
-            result_files = {}
-            if os.path.exists(scan_dir):
-                for file in os.listdir(scan_dir):
-                    file_path = os.path.join(scan_dir, file)
-                    if os.path.isfile(file_path) and file.endswith(('.json', '.sarif')):
-                        file_size = os.path.getsize(file_path)
-                        result_files[file] = {
-                            "size": file_size,
-                            "url": f"/api/v1/scan/{scan_id}/results/{file}"
-                        }
-            
-            # Get scan metadata
+        scans = []
+        for scan_id, status, summary_blob, has_summary, result_files_blob, result_count in rows:
+            summary = orjson.loads(summary_blob)
             scan_info = {
                 "scan_id": scan_id,
+                "status": status,
                 "summary": summary,
-                "result_files": result_files,
-                "result_count": len(result_files),
-                "has_summary": os.path.exists(summary_path)
+                "result_files": orjson.loads(result_files_blob),
+                "result_count": result_count,
+                "has_summary": bool(has_summary)
             }
             
             # Add metadata from summary if available
@@ -478,13 +1046,24 @@ def list_scans():
             
             scans.append(scan_info)
         
-        # Sort by scan_id (most recent first if using timestamps)
-        scans.sort(key=lambda x: x.get("scan_id", ""), reverse=True)
+        return json_response({"scans": scans, "total": total, "limit": limit, "offset": offset}), 200
         
-        return jsonify({"scans": scans}), 200
+    except Exception as e:
+        return json_response({"error": str(e)}), 500
+
+@app.route('/api/v1/admin/reindex', methods=['POST'])
+def reindex_scans():
+    """Rebuild the scan index from the results directory"""
+    try:
+        return json_response({"indexed": reindex_scan_results()}), 200
         
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return json_response({"error": str(e)}), 500
+
+# Build the index on first start so scans that predate it remain listed
+if _init_scan_index() == 0:
+    reindex_scan_results()
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # Local development only; production runs under gunicorn (see gunicorn_conf.py)
+    app.run(host='0.0.0.0', port=5000, debug=os.getenv("FLASK_DEBUG", "").lower() in ("1", "true", "yes"))
@@ -0,0 +1,24 @@
+"""
+Gunicorn configuration for the Security Scanning Platform API
+Run with: gunicorn -c gunicorn_conf.py app:app
+"""
+
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:5000")
+
+# Endpoints mostly wait on disk, subprocesses and the network. Threaded workers
+# overlap that waiting on real OS threads, which the app's own thread pools
+# (repository inspection, background scans) also rely on; gevent would turn
+# them into greenlets sharing one native thread.
+worker_class = "gthread"
+workers = int(os.getenv("WEB_CONCURRENCY", str(2 * (os.cpu_count() or 1) + 1)))
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+worker_connections = int(os.getenv("WORKER_CONNECTIONS", "1000"))
+keepalive = 30
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = 30
+
+accesslog = "-"
+errorlog = "-"